@@ -1,64 +1,86 @@
+import { Prisma } from "@prisma/client";
 import { NextResponse } from "next/server";
 import { getCurrentUserOrThrow } from "@/lib/auth/access";
 import { writeAuditEvent } from "@/lib/audit";
+import { csvStream, EXPORT_BATCH_SIZE, type ExportCursor, type ExportRow } from "@/lib/csv-export";
 import { getPrisma } from "@/lib/prisma";
 
-function csvEscape(value: unknown) {
-  const text = value instanceof Date ? value.toISOString() : String(value ?? "");
-  return /[",\n\r]/.test(text) ? `"${text.replace(/"/g, '""')}"` : text;
+function fetchContacts(after: ExportCursor | null) {
+  const keyset = after ? Prisma.sql`WHERE (c.created_at, c.id) < (${after.key}::timestamptz, ${after.id}::uuid)` : Prisma.empty;
+  return getPrisma().$queryRaw<ExportRow[]>`
+    SELECT c.email, c.first_name, c.last_name, c.full_name, c.title, c.phone, c.status, c.consent_status, co.name AS company_name, c.source, c.created_at, c.updated_at,
+      c.created_at::text AS cursor_key, c.id::text AS cursor_id
+    FROM email_contacts c
+    LEFT JOIN email_companies co ON co.id = c.company_id
+    ${keyset}
+    ORDER BY c.created_at DESC, c.id DESC
+    LIMIT ${EXPORT_BATCH_SIZE}
+  `;
 }
 
-function toCsv(rows: Array<Record<string, unknown>>) {
-  if (rows.length === 0) return "";
-  const headers = Object.keys(rows[0]);
-  return [headers.join(","), ...rows.map((row) => headers.map((header) => csvEscape(row[header])).join(","))].join("\n");
+function fetchCompanies(after: ExportCursor | null) {
+  const keyset = after ? Prisma.sql`WHERE (name, id) > (${after.key}, ${after.id}::uuid)` : Prisma.empty;
+  return getPrisma().$queryRaw<ExportRow[]>`
+    SELECT name, domain, website, industry, source, status, notes, created_at, updated_at,
+      name AS cursor_key, id::text AS cursor_id
+    FROM email_companies
+    ${keyset}
+    ORDER BY name, id
+    LIMIT ${EXPORT_BATCH_SIZE}
+  `;
+}
+
+function fetchSuppressions(after: ExportCursor | null) {
+  const keyset = after ? Prisma.sql`WHERE (created_at, id) < (${after.key}::timestamptz, ${after.id}::uuid)` : Prisma.empty;
+  return getPrisma().$queryRaw<ExportRow[]>`
+    SELECT email, reason, source, created_at,
+      created_at::text AS cursor_key, id::text AS cursor_id
+    FROM email_suppressions
+    ${keyset}
+    ORDER BY created_at DESC, id DESC
+    LIMIT ${EXPORT_BATCH_SIZE}
+  `;
+}
+
+function fetchCampaignEvents(after: ExportCursor | null) {
+  const keyset = after ? Prisma.sql`WHERE (e.created_at, e.id) < (${after.key}::timestamptz, ${after.id}::uuid)` : Prisma.empty;
+  return getPrisma().$queryRaw<ExportRow[]>`
+    SELECT e.event_type, ca.name AS campaign_name, c.email AS contact_email, e.metadata::text AS metadata, e.created_at,
+      e.created_at::text AS cursor_key, e.id::text AS cursor_id
+    FROM email_events e
+    LEFT JOIN email_campaigns ca ON ca.id = e.campaign_id
+    LEFT JOIN email_contacts c ON c.id = e.contact_id
+    ${keyset}
+    ORDER BY e.created_at DESC, e.id DESC
+    LIMIT ${EXPORT_BATCH_SIZE}
+  `;
 }
 
 export async function GET(_request: Request, { params }: { params: { type: string } }) {
   try {
     const actor = await getCurrentUserOrThrow();
-    let rows: Array<Record<string, unknown>>;
+    let fetchBatch: (after: ExportCursor | null) => Promise<ExportRow[]>;
 
     if (params.type === "contacts") {
-      rows = await getPrisma().$queryRaw<Array<Record<string, unknown>>>`
-        SELECT c.email, c.first_name, c.last_name, c.full_name, c.title, c.phone, c.status, c.consent_status, co.name AS company_name, c.source, c.created_at, c.updated_at
-        FROM email_contacts c
-        LEFT JOIN email_companies co ON co.id = c.company_id
-        ORDER BY c.created_at DESC
-      `;
+      fetchBatch = fetchContacts;
     } else if (params.type === "companies") {
-      rows = await getPrisma().$queryRaw<Array<Record<string, unknown>>>`
-        SELECT name, domain, website, industry, source, status, notes, created_at, updated_at
-        FROM email_companies
-        ORDER BY name
-      `;
+      fetchBatch = fetchCompanies;
     } else if (params.type === "suppressions") {
-      rows = await getPrisma().$queryRaw<Array<Record<string, unknown>>>`
-        SELECT email, reason, source, created_at
-        FROM email_suppressions
-        ORDER BY created_at DESC
-      `;
+      fetchBatch = fetchSuppressions;
     } else if (params.type === "campaign-events") {
-      rows = await getPrisma().$queryRaw<Array<Record<string, unknown>>>`
-        SELECT e.event_type, ca.name AS campaign_name, c.email AS contact_email, e.metadata::text AS metadata, e.created_at
-        FROM email_events e
-        LEFT JOIN email_campaigns ca ON ca.id = e.campaign_id
-        LEFT JOIN email_contacts c ON c.id = e.contact_id
-        ORDER BY e.created_at DESC
-      `;
+      fetchBatch = fetchCampaignEvents;
     } else {
       return NextResponse.json({ ok: false, error: "Unsupported export type" }, { status: 404 });
     }
 
-    await writeAuditEvent({
-      actor,
-      entityType: "email_export",
-      action: "download",
-      metadata: { type: params.type, rows: rows.length },
-    });
+    const firstBatch = await fetchBatch(null);
+    // The row count is only known once streaming ends, so it is recorded on download_finished.
+    await writeAuditEvent({ actor, entityType: "email_export", action: "download", metadata: { type: params.type } });
+    const body = csvStream(firstBatch, fetchBatch, (rows, completed) =>
+      writeAuditEvent({ actor, entityType: "email_export", action: "download_finished", metadata: { type: params.type, rows, completed } }),
+    );
 
-    const csv = toCsv(rows);
-    return new Response(csv, {
+    return new Response(body, {
       headers: {
         "content-type": "text/csv; charset=utf-8",
         "content-disposition": `attachment; filename="${params.type}.csv"`,
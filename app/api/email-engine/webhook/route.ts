@@ -2,16 +2,16 @@ import { NextRequest, NextResponse } from "next/server";
 import { suppressByBounce, suppressByUnsubscribe } from "@/lib/mail/unsubscribe";
 import { normalizeEmail } from "@/lib/mail/render-template";
 
-// Supported event types that trigger suppression.
-const SUPPRESSION_EVENTS = new Set([
-  "bounce",
-  "bounced",
-  "complaint",
-  "spamreport",
-  "spam_complaint",
-  "unsubscribe",
-  "unsubscribed",
-  "group_unsubscribe",
+// Supported event types that trigger suppression, mapped to the suppression they record.
+const SUPPRESSION_EVENTS = new Map<string, "unsubscribe" | "complaint" | "bounce">([
+  ["bounce", "bounce"],
+  ["bounced", "bounce"],
+  ["complaint", "complaint"],
+  ["spamreport", "complaint"],
+  ["spam_complaint", "complaint"],
+  ["unsubscribe", "unsubscribe"],
+  ["unsubscribed", "unsubscribe"],
+  ["group_unsubscribe", "unsubscribe"],
 ]);
 
 function getBearerToken(request: NextRequest): string {
@@ -132,21 +132,18 @@ export async function POST(request: NextRequest) {
       continue;
     }
 
-    const eventType = record.eventType.toLowerCase();
-    if (!SUPPRESSION_EVENTS.has(eventType)) {
+    const suppression = SUPPRESSION_EVENTS.get(record.eventType.toLowerCase());
+    if (!suppression) {
       // Non-suppression event (e.g. open, click) — skip silently.
       skipped += 1;
       continue;
     }
 
     try {
-      if (eventType === "unsubscribe" || eventType === "unsubscribed" || eventType === "group_unsubscribe") {
+      if (suppression === "unsubscribe") {
         await suppressByUnsubscribe(email);
       } else {
-        const reason = (eventType === "complaint" || eventType === "spamreport" || eventType === "spam_complaint")
-          ? "complaint" as const
-          : "bounce" as const;
-        await suppressByBounce(email, reason, `${provider}_webhook`);
+        await suppressByBounce(email, suppression, `${provider}_webhook`);
       }
       processed += 1;
     } catch {
@@ -109,37 +109,36 @@ export async function POST(request: Request) {
     ].join("\n");
 
     const [lead] = await getPrisma().$queryRaw<Array<{ id: string }>>`
-      INSERT INTO leads (
-        first_name,
-        last_name,
-        email,
-        phone,
-        company_name,
-        source,
-        campaign,
-        status,
-        interest_level,
-        notes
+      WITH lead AS (
+        INSERT INTO leads (
+          first_name,
+          last_name,
+          email,
+          phone,
+          company_name,
+          source,
+          campaign,
+          status,
+          interest_level,
+          notes
+        )
+        VALUES (
+          ${firstName},
+          ${lastName},
+          ${email},
+          ${phone},
+          ${companyName},
+          ${source},
+          ${projectType},
+          ${"new"},
+          ${"unknown"},
+          ${notes}
+        )
+        RETURNING id
       )
-      VALUES (
-        ${firstName},
-        ${lastName},
-        ${email},
-        ${phone},
-        ${companyName},
-        ${source},
-        ${projectType},
-        ${"new"},
-        ${"unknown"},
-        ${notes}
-      )
-      RETURNING id::text
-    `;
-
-    await getPrisma().$executeRaw`
       INSERT INTO lead_events (lead_id, event_type, metadata)
-      VALUES (
-        ${lead.id}::uuid,
+      SELECT
+        id,
         ${"intake.vulpine_supply"},
         ${
           {
@@ -159,8 +158,9 @@ export async function POST(request: Request) {
             planLink,
             payload: body,
           } as const
-        }
-      )
+        }::jsonb
+      FROM lead
+      RETURNING lead_id::text AS id
     `;
 
     return NextResponse.json({ ok: true, id: lead.id });
@@ -1,47 +1,58 @@
+import { Prisma } from "@prisma/client";
 import { NextResponse } from "next/server";
 import { getCurrentUserOrThrow } from "@/lib/auth/access";
 import { writeAuditEvent } from "@/lib/audit";
+import { csvStream, EXPORT_BATCH_SIZE, type ExportCursor, type ExportRow } from "@/lib/csv-export";
 import { getPrisma } from "@/lib/prisma";
 
-function csvEscape(value: unknown) {
-  const text = value instanceof Date ? value.toISOString() : String(value ?? "");
-  return /[",\n\r]/.test(text) ? `"${text.replace(/"/g, '""')}"` : text;
+function fetchLeads(after: ExportCursor | null) {
+  const keyset = after ? Prisma.sql`AND (created_at, id) < (${after.key}::timestamptz, ${after.id}::uuid)` : Prisma.empty;
+  return getPrisma().$queryRaw<ExportRow[]>`
+    SELECT first_name, last_name, email, phone, company_name, title, source, campaign, status, interest_level,
+      assigned_to, estimated_value::text AS estimated_value, last_contacted_at, next_follow_up_at, notes,
+      company_id::text AS company_id, contact_id::text AS contact_id, created_at, updated_at,
+      created_at::text AS cursor_key, id::text AS cursor_id
+    FROM leads
+    WHERE archived_at IS NULL ${keyset}
+    ORDER BY created_at DESC, id DESC
+    LIMIT ${EXPORT_BATCH_SIZE}
+  `;
 }
 
-function toCsv(rows: Array<Record<string, unknown>>) {
-  if (rows.length === 0) return "";
-  const headers = Object.keys(rows[0]);
-  return [headers.join(","), ...rows.map((row) => headers.map((header) => csvEscape(row[header])).join(","))].join("\n");
+function fetchLeadEvents(after: ExportCursor | null) {
+  const keyset = after ? Prisma.sql`WHERE (e.created_at, e.id) < (${after.key}::timestamptz, ${after.id}::uuid)` : Prisma.empty;
+  return getPrisma().$queryRaw<ExportRow[]>`
+    SELECT e.lead_id::text AS lead_id, l.email, l.company_name, e.event_type, coalesce(e.metadata, '{}'::jsonb)::text AS metadata, e.created_at,
+      e.created_at::text AS cursor_key, e.id::text AS cursor_id
+    FROM lead_events e
+    JOIN leads l ON l.id = e.lead_id
+    ${keyset}
+    ORDER BY e.created_at DESC, e.id DESC
+    LIMIT ${EXPORT_BATCH_SIZE}
+  `;
 }
 
 export async function GET(_request: Request, { params }: { params: { type: string } }) {
   try {
     const actor = await getCurrentUserOrThrow();
-    let rows: Array<Record<string, unknown>>;
+    let fetchBatch: (after: ExportCursor | null) => Promise<ExportRow[]>;
 
     if (params.type === "leads") {
-      rows = await getPrisma().$queryRaw<Array<Record<string, unknown>>>`
-        SELECT first_name, last_name, email, phone, company_name, title, source, campaign, status, interest_level,
-          assigned_to, estimated_value::text AS estimated_value, last_contacted_at, next_follow_up_at, notes,
-          company_id::text AS company_id, contact_id::text AS contact_id, created_at, updated_at
-        FROM leads
-        WHERE archived_at IS NULL
-        ORDER BY created_at DESC
-      `;
+      fetchBatch = fetchLeads;
     } else if (params.type === "events") {
-      rows = await getPrisma().$queryRaw<Array<Record<string, unknown>>>`
-        SELECT e.lead_id::text AS lead_id, l.email, l.company_name, e.event_type, e.metadata::text AS metadata, e.created_at
-        FROM lead_events e
-        JOIN leads l ON l.id = e.lead_id
-        ORDER BY e.created_at DESC
-      `;
+      fetchBatch = fetchLeadEvents;
     } else {
       return NextResponse.json({ ok: false, error: "Unsupported export type" }, { status: 404 });
     }
 
-    await writeAuditEvent({ actor, entityType: "lead_export", action: "download", metadata: { type: params.type, rows: rows.length } });
+    const firstBatch = await fetchBatch(null);
+    // The row count is only known once streaming ends, so it is recorded on download_finished.
+    await writeAuditEvent({ actor, entityType: "lead_export", action: "download", metadata: { type: params.type } });
+    const body = csvStream(firstBatch, fetchBatch, (rows, completed) =>
+      writeAuditEvent({ actor, entityType: "lead_export", action: "download_finished", metadata: { type: params.type, rows, completed } }),
+    );
 
-    return new Response(toCsv(rows), {
+    return new Response(body, {
       headers: {
         "content-type": "text/csv; charset=utf-8",
         "content-disposition": `attachment; filename="lead-${params.type}.csv"`,
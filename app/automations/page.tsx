@@ -58,9 +58,14 @@ export default function AutomationsPage() {
 
       // Calculate stats
       const total = data.length
-      const active = data.filter((a) => a.status === "active" && a.enabled).length
-      const totalRuns = data.reduce((sum, a) => sum + a.run_count, 0)
-      const totalSuccess = data.reduce((sum, a) => sum + a.success_count, 0)
+      let active = 0
+      let totalRuns = 0
+      let totalSuccess = 0
+      for (const a of data) {
+        if (a.status === "active" && a.enabled) active += 1
+        totalRuns += a.run_count
+        totalSuccess += a.success_count
+      }
       const successRate = totalRuns > 0 ? (totalSuccess / totalRuns) * 100 : 0
 
       setStats({ total, active, totalRuns, successRate })
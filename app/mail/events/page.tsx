@@ -1,13 +1,30 @@
+import Link from "next/link";
 import { requireActiveUser } from "@/lib/auth/access";
 import { getRecentEvents } from "@/lib/mail/data";
+import { UUID_PATTERN } from "@/lib/mail/render-template";
 import { Badge, MailShell, Panel } from "@/components/mail/ui";
 
-export default async function EventsPage({ searchParams }: { searchParams?: { type?: string } }) {
+const PAGE_SIZE = 200;
+
+// A malformed cursor would fail the ::timestamptz/::uuid casts, so fall back to the first page instead.
+function parseCursor(before?: string, beforeId?: string) {
+  if (!before || !beforeId || !/^\d{4}-\d{2}-\d{2}/.test(before) || Number.isNaN(Date.parse(before)) || !UUID_PATTERN.test(beforeId)) return null;
+  return { createdAt: before, id: beforeId };
+}
+
+function eventsHref(params: Record<string, string>) {
+  const query = new URLSearchParams(Object.entries(params).filter(([, value]) => value)).toString();
+  return query ? `/mail/events?${query}` : "/mail/events";
+}
+
+export default async function EventsPage({ searchParams }: { searchParams?: { type?: string; before?: string; beforeId?: string } }) {
   const user = await requireActiveUser();
-  const events = await getRecentEvents(200);
+  const before = parseCursor(searchParams?.before, searchParams?.beforeId);
+  const events = await getRecentEvents(PAGE_SIZE, before);
   const type = searchParams?.type ?? "";
   const filtered = type ? events.filter((event) => event.event_type === type) : events;
   const types = Array.from(new Set(events.map((event) => event.event_type))).sort();
+  const last = events.length === PAGE_SIZE ? events[events.length - 1] : null;
   return (
     <MailShell user={user} title="Email Events">
       <Panel title="Filters">
@@ -30,6 +47,18 @@ export default async function EventsPage({ searchParams }: { searchParams?: { ty
             </div>
           ))}
         </div>
+        <div className="mt-4 flex gap-2">
+          {before ? (
+            <Link href={eventsHref({ type })} className="border border-borderSubtle px-3 py-2 text-xs uppercase text-textSecondary hover:border-cyber-cyan hover:text-cyber-cyan">
+              Newest
+            </Link>
+          ) : null}
+          {last ? (
+            <Link href={eventsHref({ type, before: last.cursor_created_at, beforeId: last.id })} className="border border-cyber-cyan px-3 py-2 text-xs uppercase text-cyber-cyan">
+              Older events
+            </Link>
+          ) : null}
+        </div>
       </Panel>
     </MailShell>
   );
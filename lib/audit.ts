@@ -19,7 +19,7 @@ export async function writeAuditEvent(input: {
       ${input.entityType},
       ${input.entityId ?? null},
       ${input.action},
-      ${input.metadata ?? {}}
+      ${input.metadata ?? null}
     )
   `;
 }
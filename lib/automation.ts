@@ -11,7 +11,7 @@ export async function createAutomationRun(input: {
 }) {
   const [run] = await getPrisma().$queryRaw<Array<{ id: string }>>`
     INSERT INTO automation_runs (source, action, status, input)
-    VALUES (${input.source}, ${input.action}, 'pending', ${input.payload ?? {}})
+    VALUES (${input.source}, ${input.action}, 'pending', coalesce(${input.payload ?? null}::jsonb, '{}'::jsonb))
     RETURNING id::text
   `;
   await writeAuditEvent({
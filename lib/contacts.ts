@@ -49,21 +49,24 @@ function trim(value: unknown) {
   return typeof value === "string" && value.trim() ? value.trim() : null;
 }
 
+const CONTACT_SORT_COLUMNS: Record<string, Prisma.Sql> = {
+  name: Prisma.sql`lower(coalesce(c.full_name, concat_ws(' ', c.first_name, c.last_name), c.email))`,
+  company: Prisma.sql`lower(coalesce(co.name, ''))`,
+  phone: Prisma.sql`lower(coalesce(c.phone, ''))`,
+  email: Prisma.sql`lower(c.email)`,
+  role: Prisma.sql`lower(coalesce(c.title, ''))`,
+  status: Prisma.sql`c.status`,
+  relatedLeads: Prisma.sql`related.related_leads_count`,
+  lastActivity: Prisma.sql`activity.last_activity_at`,
+  createdAt: Prisma.sql`c.created_at`,
+  updatedAt: Prisma.sql`c.updated_at`,
+};
+const SORT_ASC = Prisma.sql`ASC`;
+const SORT_DESC = Prisma.sql`DESC`;
+
 function contactSortClause(sort?: string, dir?: string) {
-  const direction = dir === "asc" ? Prisma.sql`ASC` : Prisma.sql`DESC`;
-  const sortMap: Record<string, Prisma.Sql> = {
-    name: Prisma.sql`lower(coalesce(c.full_name, concat_ws(' ', c.first_name, c.last_name), c.email))`,
-    company: Prisma.sql`lower(coalesce(co.name, ''))`,
-    phone: Prisma.sql`lower(coalesce(c.phone, ''))`,
-    email: Prisma.sql`lower(c.email)`,
-    role: Prisma.sql`lower(coalesce(c.title, ''))`,
-    status: Prisma.sql`c.status`,
-    relatedLeads: Prisma.sql`related.related_leads_count`,
-    lastActivity: Prisma.sql`activity.last_activity_at`,
-    createdAt: Prisma.sql`c.created_at`,
-    updatedAt: Prisma.sql`c.updated_at`,
-  };
-  const column = sortMap[sort ?? "updatedAt"] ?? sortMap.updatedAt;
+  const direction = dir === "asc" ? SORT_ASC : SORT_DESC;
+  const column = CONTACT_SORT_COLUMNS[sort ?? "updatedAt"] ?? CONTACT_SORT_COLUMNS.updatedAt;
   return Prisma.sql`${column} ${direction} NULLS LAST, c.updated_at DESC`;
 }
 
@@ -127,32 +130,35 @@ export async function countContacts(filters: ContactListFilters = {}) {
 }
 
 export async function getContactDetail(id: string) {
-  const [contact] = await getPrisma().$queryRaw<ContactRecord[]>`
-    SELECT c.id::text, c.first_name, c.last_name, c.full_name, c.email, c.phone, c.title, c.source, c.status,
-      c.consent_status, c.company_id::text, co.name AS company_name, co.status AS company_status, co.company_type,
-      c.notes, related.related_leads_count::int, activity.last_activity_at, c.created_at, c.updated_at
-    FROM email_contacts c
-    LEFT JOIN email_companies co ON co.id = c.company_id
-    LEFT JOIN LATERAL (
-      SELECT count(*) AS related_leads_count
-      FROM leads l
-      WHERE l.contact_id = c.id AND l.archived_at IS NULL
-    ) related ON true
-    LEFT JOIN LATERAL (
-      SELECT max(e.created_at) AS last_activity_at
-      FROM email_events e
-      WHERE e.contact_id = c.id
-    ) activity ON true
-    WHERE c.id = ${id}::uuid
-    LIMIT 1
-  `;
+  const prisma = getPrisma();
+  const [[contact], relatedLeads] = await Promise.all([
+    prisma.$queryRaw<ContactRecord[]>`
+      SELECT c.id::text, c.first_name, c.last_name, c.full_name, c.email, c.phone, c.title, c.source, c.status,
+        c.consent_status, c.company_id::text, co.name AS company_name, co.status AS company_status, co.company_type,
+        c.notes, related.related_leads_count::int, activity.last_activity_at, c.created_at, c.updated_at
+      FROM email_contacts c
+      LEFT JOIN email_companies co ON co.id = c.company_id
+      LEFT JOIN LATERAL (
+        SELECT count(*) AS related_leads_count
+        FROM leads l
+        WHERE l.contact_id = c.id AND l.archived_at IS NULL
+      ) related ON true
+      LEFT JOIN LATERAL (
+        SELECT max(e.created_at) AS last_activity_at
+        FROM email_events e
+        WHERE e.contact_id = c.id
+      ) activity ON true
+      WHERE c.id = ${id}::uuid
+      LIMIT 1
+    `,
+    prisma.$queryRaw<ContactLeadSummary[]>`
+      SELECT id::text, nullif(full_name, '') AS name, status, source, estimated_value::text, updated_at
+      FROM leads
+      WHERE contact_id = ${id}::uuid AND archived_at IS NULL
+      ORDER BY updated_at DESC
+      LIMIT 10
+    `,
+  ]);
   if (!contact) return null;
-  const relatedLeads = await getPrisma().$queryRaw<ContactLeadSummary[]>`
-    SELECT id::text, nullif(concat_ws(' ', first_name, last_name), '') AS name, status, source, estimated_value::text, updated_at
-    FROM leads
-    WHERE contact_id = ${id}::uuid AND archived_at IS NULL
-    ORDER BY updated_at DESC
-    LIMIT 10
-  `;
   return { contact, relatedLeads };
 }
@@ -0,0 +1,57 @@
+export const EXPORT_BATCH_SIZE = 1000;
+
+// Keyset position of the last exported row: the sort key as text plus the row id as a tie-break.
+export type ExportCursor = { key: string; id: string };
+export type ExportRow = Record<string, unknown> & { cursor_key: string; cursor_id: string };
+
+export function csvEscape(value: unknown) {
+  const text = value instanceof Date ? value.toISOString() : String(value ?? "");
+  return /[",\n\r]/.test(text) ? `"${text.replace(/"/g, '""')}"` : text;
+}
+
+// The caller fetches the first batch itself, before building its Response, so setup and query
+// errors still reach the route's catch; only the later batches are fetched while streaming.
+export function csvStream(
+  firstBatch: ExportRow[],
+  fetchBatch: (after: ExportCursor | null) => Promise<ExportRow[]>,
+  onFinish: (rows: number, completed: boolean) => Promise<void>,
+) {
+  const encoder = new TextEncoder();
+  const headers = firstBatch.length > 0 ? Object.keys(firstBatch[0]).filter((header) => header !== "cursor_key" && header !== "cursor_id") : [];
+  let pending: ExportRow[] | null = firstBatch;
+  let after: ExportCursor | null = null;
+  let total = 0;
+  let finished = false;
+
+  async function finish(completed: boolean) {
+    if (finished) return;
+    finished = true;
+    await onFinish(total, completed);
+  }
+
+  return new ReadableStream<Uint8Array>({
+    async pull(controller) {
+      try {
+        const rows = pending ?? (await fetchBatch(after));
+        pending = null;
+        if (rows.length > 0) {
+          const lines = rows.map((row) => headers.map((header) => csvEscape(row[header])).join(",")).join("\n");
+          controller.enqueue(encoder.encode(total === 0 ? `${headers.join(",")}\n${lines}` : `\n${lines}`));
+          total += rows.length;
+          const last = rows[rows.length - 1];
+          after = { key: last.cursor_key, id: last.cursor_id };
+        }
+        if (rows.length < EXPORT_BATCH_SIZE) {
+          await finish(true);
+          controller.close();
+        }
+      } catch (error) {
+        controller.error(error);
+        await finish(false).catch(() => undefined);
+      }
+    },
+    async cancel() {
+      await finish(false);
+    },
+  });
+}
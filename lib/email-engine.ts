@@ -7,6 +7,8 @@ import { normalizeEmail, renderTemplate } from "@/lib/mail/render-template";
 
 type JsonInput = Prisma.InputJsonValue;
 
+const RECIPIENT_BATCH_SIZE = 500;
+
 export type EmailEngineStats = {
   total_contacts: bigint;
   total_companies: bigint;
@@ -282,7 +284,7 @@ export async function generateCampaignRecipients(campaignId: string, actor: AppU
       AND c.status = 'active'
   `;
 
-  for (const contact of contacts) {
+  const recipients = contacts.map((contact) => {
     const payload = {
       firstName: contact.first_name,
       lastName: contact.last_name,
@@ -294,20 +296,37 @@ export async function generateCampaignRecipients(campaignId: string, actor: AppU
     const subject = renderTemplate(campaign.subject_override ?? campaign.subject, payload);
     const html = renderTemplate(campaign.body_html, payload);
     const text = renderTemplate(campaign.body_text, payload);
-    const [recipient] = await getPrisma().$queryRaw<Array<{ id: string }>>`
-      INSERT INTO email_campaign_recipients (campaign_id, contact_id, status, personalized_subject, personalized_body, personalized_html, personalized_text)
-      VALUES (${campaignId}::uuid, ${contact.id}::uuid, 'draft_ready', ${subject}, ${text || html}, ${html || ""}, ${text || null})
-      ON CONFLICT (campaign_id, contact_id) DO UPDATE SET
-        personalized_subject = EXCLUDED.personalized_subject,
-        personalized_body = EXCLUDED.personalized_body,
-        personalized_html = EXCLUDED.personalized_html,
-        personalized_text = EXCLUDED.personalized_text,
-        updated_at = now()
-      RETURNING id::text
-    `;
+    return {
+      contact_id: contact.id,
+      personalized_subject: subject,
+      personalized_body: text || html,
+      personalized_html: html || "",
+      personalized_text: text || null,
+    };
+  });
+
+  for (let start = 0; start < recipients.length; start += RECIPIENT_BATCH_SIZE) {
+    const batch = recipients.slice(start, start + RECIPIENT_BATCH_SIZE);
     await getPrisma().$executeRaw`
+      WITH input AS (
+        SELECT *
+        FROM jsonb_to_recordset(${JSON.stringify(batch)}::jsonb)
+          AS r(contact_id uuid, personalized_subject text, personalized_body text, personalized_html text, personalized_text text)
+      ), upserted AS (
+        INSERT INTO email_campaign_recipients (campaign_id, contact_id, status, personalized_subject, personalized_body, personalized_html, personalized_text)
+        SELECT ${campaignId}::uuid, contact_id, 'draft_ready', personalized_subject, personalized_body, personalized_html, personalized_text
+        FROM input
+        ON CONFLICT (campaign_id, contact_id) DO UPDATE SET
+          personalized_subject = EXCLUDED.personalized_subject,
+          personalized_body = EXCLUDED.personalized_body,
+          personalized_html = EXCLUDED.personalized_html,
+          personalized_text = EXCLUDED.personalized_text,
+          updated_at = now()
+        RETURNING id, contact_id
+      )
       INSERT INTO email_events (campaign_id, recipient_id, contact_id, event_type, metadata)
-      VALUES (${campaignId}::uuid, ${recipient.id}::uuid, ${contact.id}::uuid, 'draft_generated', ${JSON.stringify({ source: "email_engine" })}::jsonb)
+      SELECT ${campaignId}::uuid, id, contact_id, 'draft_generated', jsonb_build_object('source', 'email_engine')
+      FROM upserted
     `;
   }
 
@@ -22,6 +22,9 @@ type LeadStatus = (typeof LEAD_STATUSES)[number];
 type InterestLevel = (typeof INTEREST_LEVELS)[number];
 type JsonInput = Prisma.InputJsonValue;
 
+const LEAD_STATUS_SET = new Set<string>(LEAD_STATUSES);
+const INTEREST_LEVEL_SET = new Set<string>(INTEREST_LEVELS);
+
 export type LeadInput = Record<string, unknown>;
 
 export type LeadListFilters = {
@@ -54,13 +57,13 @@ export function normalizePhoneForDedupe(value: unknown) {
 
 function validateStatus(value: unknown): LeadStatus {
   const status = trim(value) ?? "new";
-  if (!LEAD_STATUSES.includes(status as LeadStatus)) throw new Error(`Invalid lead status: ${status}`);
+  if (!LEAD_STATUS_SET.has(status)) throw new Error(`Invalid lead status: ${status}`);
   return status as LeadStatus;
 }
 
 function validateInterestLevel(value: unknown): InterestLevel {
   const interest = trim(value) ?? "unknown";
-  if (!INTEREST_LEVELS.includes(interest as InterestLevel)) throw new Error(`Invalid interest level: ${interest}`);
+  if (!INTEREST_LEVEL_SET.has(interest)) throw new Error(`Invalid interest level: ${interest}`);
   return interest as InterestLevel;
 }
 
@@ -80,22 +83,25 @@ function parseDecimal(value: unknown) {
   return number;
 }
 
+const LEAD_SORT_COLUMNS: Record<string, Prisma.Sql> = {
+  name: Prisma.sql`lower(l.full_name)`,
+  company: Prisma.sql`lower(coalesce(l.company_name, co.name, ''))`,
+  phone: Prisma.sql`lower(coalesce(l.phone, ''))`,
+  email: Prisma.sql`lower(coalesce(l.email, ''))`,
+  status: Prisma.sql`l.status`,
+  source: Prisma.sql`lower(coalesce(l.source, ''))`,
+  assignedTo: Prisma.sql`lower(coalesce(l.assigned_to, ''))`,
+  estimatedValue: Prisma.sql`l.estimated_value`,
+  lastContactedAt: Prisma.sql`l.last_contacted_at`,
+  createdAt: Prisma.sql`l.created_at`,
+  updatedAt: Prisma.sql`l.updated_at`,
+};
+const SORT_ASC = Prisma.sql`ASC`;
+const SORT_DESC = Prisma.sql`DESC`;
+
 function leadSortClause(sort?: string, dir?: string) {
-  const direction = dir === "asc" ? Prisma.sql`ASC` : Prisma.sql`DESC`;
-  const sortMap: Record<string, Prisma.Sql> = {
-    name: Prisma.sql`lower(concat_ws(' ', l.first_name, l.last_name))`,
-    company: Prisma.sql`lower(coalesce(l.company_name, co.name, ''))`,
-    phone: Prisma.sql`lower(coalesce(l.phone, ''))`,
-    email: Prisma.sql`lower(coalesce(l.email, ''))`,
-    status: Prisma.sql`l.status`,
-    source: Prisma.sql`lower(coalesce(l.source, ''))`,
-    assignedTo: Prisma.sql`lower(coalesce(l.assigned_to, ''))`,
-    estimatedValue: Prisma.sql`l.estimated_value`,
-    lastContactedAt: Prisma.sql`l.last_contacted_at`,
-    createdAt: Prisma.sql`l.created_at`,
-    updatedAt: Prisma.sql`l.updated_at`,
-  };
-  const column = sortMap[sort ?? "createdAt"] ?? sortMap.createdAt;
+  const direction = dir === "asc" ? SORT_ASC : SORT_DESC;
+  const column = LEAD_SORT_COLUMNS[sort ?? "createdAt"] ?? LEAD_SORT_COLUMNS.createdAt;
   return Prisma.sql`${column} ${direction} NULLS LAST, l.created_at DESC`;
 }
 
@@ -110,7 +116,7 @@ function leadWhereClause(input: {
   const searchPattern = `%${input.search}%`;
   return Prisma.sql`
     l.archived_at IS NULL
-      AND (${input.search} = '' OR l.email ILIKE ${searchPattern} OR l.phone ILIKE ${searchPattern} OR l.company_name ILIKE ${searchPattern} OR l.notes ILIKE ${searchPattern} OR concat_ws(' ', l.first_name, l.last_name) ILIKE ${searchPattern})
+      AND (${input.search} = '' OR l.email ILIKE ${searchPattern} OR l.phone ILIKE ${searchPattern} OR l.company_name ILIKE ${searchPattern} OR l.notes ILIKE ${searchPattern} OR l.full_name ILIKE ${searchPattern})
       AND (${input.status} = '' OR l.status = ${input.status})
       AND (${input.source} = '' OR l.source = ${input.source})
       AND (${input.campaign} = '' OR l.campaign = ${input.campaign})
@@ -122,7 +128,7 @@ function leadWhereClause(input: {
 export async function addLeadEvent(leadId: string, eventType: string, metadata?: JsonInput) {
   await getPrisma().$executeRaw`
     INSERT INTO lead_events (lead_id, event_type, metadata)
-    VALUES (${leadId}::uuid, ${eventType}, ${metadata ?? {}})
+    VALUES (${leadId}::uuid, ${eventType}, ${metadata ?? null})
   `;
 }
 
@@ -241,8 +247,33 @@ export async function countLeads(filters: LeadListFilters = {}) {
 }
 
 export async function getLead(id: string) {
-  const [lead] = await getPrisma().$queryRaw<Array<{ id: string } & Record<string, unknown>>>`
-    SELECT l.*, l.id::text AS id, l.company_id::text AS company_id, l.contact_id::text AS contact_id
+  const [lead] = await getPrisma().$queryRaw<
+    Array<{
+      id: string;
+      first_name: string | null;
+      last_name: string | null;
+      email: string | null;
+      phone: string | null;
+      company_name: string | null;
+      title: string | null;
+      source: string | null;
+      campaign: string | null;
+      status: string;
+      interest_level: string;
+      assigned_to: string | null;
+      estimated_value: string | null;
+      last_contacted_at: Date | null;
+      next_follow_up_at: Date | null;
+      notes: string | null;
+      company_id: string | null;
+      contact_id: string | null;
+      created_at: Date;
+      updated_at: Date;
+    }>
+  >`
+    SELECT l.id::text, l.first_name, l.last_name, l.email, l.phone, l.company_name, l.title, l.source, l.campaign,
+      l.status, l.interest_level, l.assigned_to, l.estimated_value::text, l.last_contacted_at, l.next_follow_up_at,
+      l.notes, l.company_id::text, l.contact_id::text, l.created_at, l.updated_at
     FROM leads l
     WHERE l.id = ${id}::uuid AND l.archived_at IS NULL
     LIMIT 1
@@ -278,8 +309,16 @@ export async function createLead(input: LeadInput, actor: AppUser) {
   return { duplicate: false, lead };
 }
 
+// A cheap existence check that keeps "Lead not found" ahead of duplicate and validation errors.
+async function assertLeadExists(id: string) {
+  const [lead] = await getPrisma().$queryRaw<Array<{ id: string }>>`
+    SELECT id::text FROM leads WHERE id = ${id}::uuid AND archived_at IS NULL
+  `;
+  if (!lead) throw new Error("Lead not found");
+}
+
 export async function updateLead(id: string, input: LeadInput, actor: AppUser) {
-  await getLead(id);
+  await assertLeadExists(id);
   const email = normalizeEmail(input.email);
   const duplicate = await dedupeLeadByEmailOrPhone({ ...input, email }, id);
   if (duplicate) {
@@ -288,7 +327,7 @@ export async function updateLead(id: string, input: LeadInput, actor: AppUser) {
   const status = input.status === undefined ? null : validateStatus(input.status);
   const interestLevel = input.interestLevel === undefined && input.interest_level === undefined ? null : validateInterestLevel(input.interestLevel ?? input.interest_level);
 
-  await getPrisma().$executeRaw`
+  const [lead] = await getPrisma().$queryRaw<Array<{ id: string }>>`
     UPDATE leads
     SET first_name = ${trim(input.firstName ?? input.first_name)},
       last_name = ${trim(input.lastName ?? input.last_name)},
@@ -306,95 +345,99 @@ export async function updateLead(id: string, input: LeadInput, actor: AppUser) {
       next_follow_up_at = ${parseDate(input.nextFollowUpAt ?? input.next_follow_up_at)},
       notes = ${trim(input.notes)},
       updated_at = now()
-    WHERE id = ${id}::uuid
+    WHERE id = ${id}::uuid AND archived_at IS NULL
+    RETURNING id::text
   `;
+  if (!lead) throw new Error("Lead not found");
   await addLeadEvent(id, "updated", { fields: Object.keys(input) });
   await writeAuditEvent({ actor, entityType: "lead", entityId: id, action: "update", metadata: { fields: Object.keys(input) } });
   return { duplicate: false, lead: { id } };
 }
 
 export async function archiveLead(id: string, actor: AppUser) {
-  await getLead(id);
-  await getPrisma().$executeRaw`UPDATE leads SET archived_at = now(), updated_at = now() WHERE id = ${id}::uuid`;
-  await addLeadEvent(id, "archived", {});
+  const [lead] = await getPrisma().$queryRaw<Array<{ id: string }>>`
+    UPDATE leads SET archived_at = now(), updated_at = now() WHERE id = ${id}::uuid AND archived_at IS NULL RETURNING id::text
+  `;
+  if (!lead) throw new Error("Lead not found");
+  await addLeadEvent(id, "archived");
   await writeAuditEvent({ actor, entityType: "lead", entityId: id, action: "archive" });
   return { id };
 }
 
 export async function addLeadNote(leadId: string, body: string, actor: AppUser) {
-  await getLead(leadId);
+  await assertLeadExists(leadId);
   const cleanBody = trim(body);
   if (!cleanBody) throw new Error("note body is required");
   const [note] = await getPrisma().$queryRaw<Array<{ id: string }>>`
     INSERT INTO lead_notes (lead_id, body, created_by)
-    VALUES (${leadId}::uuid, ${cleanBody}, ${actor.email})
+    SELECT id, ${cleanBody}, ${actor.email}
+    FROM leads
+    WHERE id = ${leadId}::uuid AND archived_at IS NULL
     RETURNING id::text
   `;
+  if (!note) throw new Error("Lead not found");
   await addLeadEvent(leadId, "note_added", { noteId: note.id });
   await writeAuditEvent({ actor, entityType: "lead", entityId: leadId, action: "note_added", metadata: { noteId: note.id } });
   return note;
 }
 
 export async function assignLead(leadId: string, assignedTo: string, actor: AppUser) {
-  await getLead(leadId);
+  await assertLeadExists(leadId);
   const cleanAssignedTo = trim(assignedTo);
   if (!cleanAssignedTo) throw new Error("assignedTo is required");
   const [assignment] = await getPrisma().$queryRaw<Array<{ id: string }>>`
+    WITH lead AS (
+      UPDATE leads SET assigned_to = ${cleanAssignedTo}, updated_at = now()
+      WHERE id = ${leadId}::uuid AND archived_at IS NULL
+      RETURNING id
+    )
     INSERT INTO lead_assignments (lead_id, assigned_to, assigned_by)
-    VALUES (${leadId}::uuid, ${cleanAssignedTo}, ${actor.email})
+    SELECT id, ${cleanAssignedTo}, ${actor.email}
+    FROM lead
     RETURNING id::text
   `;
-  await getPrisma().$executeRaw`UPDATE leads SET assigned_to = ${cleanAssignedTo}, updated_at = now() WHERE id = ${leadId}::uuid`;
+  if (!assignment) throw new Error("Lead not found");
   await addLeadEvent(leadId, "assigned", { assignedTo: cleanAssignedTo, assignmentId: assignment.id });
   await writeAuditEvent({ actor, entityType: "lead", entityId: leadId, action: "assign", metadata: { assignedTo: cleanAssignedTo } });
   return assignment;
 }
 
 export async function updateLeadStatus(leadId: string, status: string, actor: AppUser) {
-  await getLead(leadId);
+  await assertLeadExists(leadId);
   const nextStatus = validateStatus(status);
-  await getPrisma().$executeRaw`
+  const [lead] = await getPrisma().$queryRaw<Array<{ id: string }>>`
     UPDATE leads
     SET status = ${nextStatus},
       last_contacted_at = CASE WHEN ${nextStatus} IN ('attempted_contact', 'contacted') THEN now() ELSE last_contacted_at END,
       updated_at = now()
-    WHERE id = ${leadId}::uuid
+    WHERE id = ${leadId}::uuid AND archived_at IS NULL
+    RETURNING id::text
   `;
+  if (!lead) throw new Error("Lead not found");
   await addLeadEvent(leadId, "status_changed", { status: nextStatus });
   await writeAuditEvent({ actor, entityType: "lead", entityId: leadId, action: "status_changed", metadata: { status: nextStatus } });
   return { id: leadId, status: nextStatus };
 }
 
 export async function convertLeadToContactAndCompany(leadId: string, actor: AppUser) {
-  const lead = await getLead(leadId) as {
-    id: string;
-    company_id: string | null;
-    contact_id: string | null;
-    company_name: string | null;
-    first_name: string | null;
-    last_name: string | null;
-    email: string | null;
-    phone: string | null;
-    title: string | null;
-    source: string | null;
-    notes: string | null;
-  };
+  const lead = await getLead(leadId);
 
   let companyId = lead.company_id;
   if (!companyId && lead.company_name) {
-    const [existing] = await getPrisma().$queryRaw<Array<{ id: string }>>`
-      SELECT id::text FROM email_companies WHERE lower(name) = lower(${lead.company_name}) LIMIT 1
-    `;
-    if (existing?.id) {
-      companyId = existing.id;
-    } else {
-      const [company] = await getPrisma().$queryRaw<Array<{ id: string }>>`
+    const [company] = await getPrisma().$queryRaw<Array<{ id: string }>>`
+      WITH existing AS (
+        SELECT id FROM email_companies WHERE lower(name) = lower(${lead.company_name}) LIMIT 1
+      ), inserted AS (
         INSERT INTO email_companies (name, source, notes)
-        VALUES (${lead.company_name}, ${lead.source}, ${lead.notes})
-        RETURNING id::text
-      `;
-      companyId = company.id;
-    }
+        SELECT ${lead.company_name}, ${lead.source}, ${lead.notes}
+        WHERE NOT EXISTS (SELECT 1 FROM existing)
+        RETURNING id
+      )
+      SELECT id::text FROM existing
+      UNION ALL
+      SELECT id::text FROM inserted
+    `;
+    companyId = company.id;
   }
 
   let contactId = lead.contact_id;
@@ -6,14 +6,15 @@ import { redirect } from "next/navigation";
 import { requireActiveUser } from "@/lib/auth/access";
 import { writeAuditEvent } from "@/lib/audit";
 import { getPrisma } from "@/lib/prisma";
-import { ensureSendSettings } from "@/lib/mail/data";
-import { enqueueManualCampaign, processEmailQueue, queueSingleEmail } from "@/lib/mail/queue";
+import { ensureSendSettings, invalidateSendSettingsCache } from "@/lib/mail/data";
+import { enqueueManualCampaign, processEmailQueue, queueSingleEmail, sendBlockReason } from "@/lib/mail/queue";
 import { normalizeEmail, renderTemplate } from "@/lib/mail/render-template";
 
 type ActionState = { ok: boolean; message: string };
 
 const MAIL_PATHS = ["/contacts", "/mail", "/mail/contacts", "/mail/companies", "/mail/lists", "/mail/templates", "/mail/campaigns", "/mail/events", "/mail/suppressions", "/mail/settings", "/mail/send", "/email-engine/queue", "/email-engine/overview", "/email-engine/deliverability"];
-const UNSENDABLE_CONTACT_STATUSES = new Set(["bounced", "unsubscribed", "do_not_contact", "archived"]);
+const RECIPIENT_BATCH_SIZE = 500;
+const IMPORT_BATCH_SIZE = 500;
 
 function value(formData: FormData, key: string) {
   const raw = formData.get(key);
@@ -40,7 +41,7 @@ async function logEvent(input: {
 }) {
   await getPrisma().$executeRaw`
     INSERT INTO email_events (campaign_id, recipient_id, contact_id, event_type, metadata)
-    VALUES (${input.campaignId ?? null}::uuid, ${input.recipientId ?? null}::uuid, ${input.contactId ?? null}::uuid, ${input.eventType}, ${input.metadata ?? {}})
+    VALUES (${input.campaignId ?? null}::uuid, ${input.recipientId ?? null}::uuid, ${input.contactId ?? null}::uuid, ${input.eventType}, coalesce(${input.metadata ?? null}::jsonb, '{}'::jsonb))
   `;
 }
 
@@ -149,11 +150,11 @@ export async function importContactsCsv(_prev: ActionState, formData: FormData):
   const rows = text.split(/\r?\n/).filter((line) => line.trim());
   if (rows.length < 2) return { ok: false, message: "CSV must include headers and at least one row" };
   const headers = parseCsvLine(rows[0]).map((header) => header.trim().toLowerCase());
-  let imported = 0;
   let skipped = 0;
   const errors: string[] = [];
   const prisma = getPrisma();
 
+  const parsed: Array<{ email: string; row: Record<string, string> }> = [];
   for (const [index, line] of rows.slice(1).entries()) {
     const cells = parseCsvLine(line);
     const row = Object.fromEntries(headers.map((header, cellIndex) => [header, cells[cellIndex] ?? ""]));
@@ -163,32 +164,72 @@ export async function importContactsCsv(_prev: ActionState, formData: FormData):
       skipped += 1;
       continue;
     }
-    const [suppressed] = await prisma.$queryRaw<Array<{ exists: boolean }>>`SELECT EXISTS (SELECT 1 FROM email_suppressions WHERE email = ${email})`;
-    if (suppressed?.exists) {
-      skipped += 1;
-      continue;
-    }
-    let companyId: string | null = null;
-    if (row.company_name?.trim()) {
-      const companyName = row.company_name.trim();
-      const [existing] = await prisma.$queryRaw<Array<{ id: string }>>`
-        SELECT id::text AS id FROM email_companies WHERE lower(name) = lower(${companyName}) LIMIT 1
-      `;
-      if (existing?.id) {
-        companyId = existing.id;
-      } else {
-        const [company] = await prisma.$queryRaw<Array<{ id: string }>>`
-          INSERT INTO email_companies (name, website)
-          VALUES (${companyName}, ${row.website?.trim() || null})
-          RETURNING id::text
-        `;
-        companyId = company?.id ?? null;
-      }
+    parsed.push({ email, row });
+  }
+
+  const suppressedRows = parsed.length
+    ? await prisma.$queryRaw<Array<{ email: string }>>`SELECT email FROM email_suppressions WHERE email = ANY(${[...new Set(parsed.map(({ email }) => email))]})`
+    : [];
+  const suppressed = new Set(suppressedRows.map(({ email }) => email));
+  const importable = parsed.filter(({ email }) => !suppressed.has(email));
+  skipped += parsed.length - importable.length;
+
+  const companies = new Map<string, { name: string; website: string | null }>();
+  for (const { row } of importable) {
+    const companyName = row.company_name?.trim();
+    if (companyName && !companies.has(companyName.toLowerCase())) {
+      companies.set(companyName.toLowerCase(), { name: companyName, website: row.website?.trim() || null });
     }
+  }
+  // Resolved ids are keyed by the submitted name itself so SQL lower() and JS toLowerCase() never have to agree.
+  const companyIds = new Map<string, string>();
+  if (companies.size > 0) {
+    const resolved = await prisma.$queryRaw<Array<{ key: string; id: string }>>`
+      WITH input AS (
+        SELECT * FROM jsonb_to_recordset(${JSON.stringify([...companies.values()])}::jsonb) AS r(name text, website text)
+      ), existing AS (
+        SELECT DISTINCT ON (input.name) input.name AS key, co.id
+        FROM email_companies co
+        JOIN input ON lower(input.name) = lower(co.name)
+        ORDER BY input.name
+      ), inserted AS (
+        INSERT INTO email_companies (name, website)
+        SELECT name, website FROM input
+        WHERE NOT EXISTS (SELECT 1 FROM existing WHERE existing.key = input.name)
+        RETURNING name AS key, id
+      )
+      SELECT key, id::text FROM existing
+      UNION ALL
+      SELECT key, id::text FROM inserted
+    `;
+    resolved.forEach(({ key, id }) => companyIds.set(key, id));
+  }
+
+  // Rows sharing an email are merged the way sequential upserts would: later non-empty cells win.
+  const contacts = new Map<string, Record<string, string | null>>();
+  for (const { email, row } of importable) {
+    const next = {
+      email,
+      company_id: companyIds.get(companies.get(row.company_name?.trim().toLowerCase() ?? "")?.name ?? "") ?? null,
+      first_name: row.first_name || null,
+      last_name: row.last_name || null,
+      full_name: row.full_name || null,
+      phone: row.phone || null,
+      title: row.title || null,
+      source: row.source || null,
+      notes: row.notes || null,
+    };
+    const previous = contacts.get(email);
+    contacts.set(email, previous ? Object.fromEntries(Object.entries(next).map(([key, cell]) => [key, cell ?? previous[key]])) : next);
+  }
+  const records = [...contacts.values()];
+  for (let start = 0; start < records.length; start += IMPORT_BATCH_SIZE) {
+    const batch = records.slice(start, start + IMPORT_BATCH_SIZE);
     await prisma.$executeRaw`
       INSERT INTO email_contacts (company_id, first_name, last_name, full_name, email, phone, title, source, status, notes)
-      VALUES (${companyId}::uuid, ${row.first_name || null}, ${row.last_name || null}, ${row.full_name || null}, ${email},
-        ${row.phone || null}, ${row.title || null}, ${row.source || null}, 'active', ${row.notes || null})
+      SELECT company_id, first_name, last_name, full_name, email, phone, title, source, 'active', notes
+      FROM jsonb_to_recordset(${JSON.stringify(batch)}::jsonb)
+        AS r(company_id uuid, first_name text, last_name text, full_name text, email text, phone text, title text, source text, notes text)
       ON CONFLICT (email) DO UPDATE SET
         company_id = coalesce(EXCLUDED.company_id, email_contacts.company_id),
         first_name = coalesce(EXCLUDED.first_name, email_contacts.first_name),
@@ -200,8 +241,8 @@ export async function importContactsCsv(_prev: ActionState, formData: FormData):
         notes = coalesce(EXCLUDED.notes, email_contacts.notes),
         updated_at = now()
     `;
-    imported += 1;
   }
+  const imported = importable.length;
   refreshMail();
   await writeAuditEvent({ actor, entityType: "email_contact", action: "csv_import", metadata: { imported, skipped, errors: errors.length } });
   return { ok: errors.length === 0, message: `Imported ${imported}. Skipped ${skipped}. Errors ${errors.length}${errors.length ? `: ${errors.slice(0, 3).join("; ")}` : ""}` };
@@ -303,7 +344,7 @@ export async function generateCampaignRecipients(formData: FormData) {
       AND s.email IS NULL
       AND c.status = 'active'
   `;
-  for (const contact of contacts) {
+  const recipients = contacts.map((contact) => {
     const payload = {
       firstName: contact.first_name,
       lastName: contact.last_name,
@@ -315,30 +356,43 @@ export async function generateCampaignRecipients(formData: FormData) {
     const subject = renderTemplate(campaign.subject, payload);
     const html = renderTemplate(campaign.body_html, payload);
     const text = renderTemplate(campaign.body_text, payload);
-    const [recipient] = await getPrisma().$queryRaw<Array<{ id: string }>>`
-      INSERT INTO email_campaign_recipients (campaign_id, contact_id, status, personalized_subject, personalized_body, personalized_html, personalized_text)
-      VALUES (${campaignId}::uuid, ${contact.id}::uuid, 'draft_ready', ${subject}, ${text || html}, ${html || null}, ${text || null})
-      ON CONFLICT (campaign_id, contact_id) DO UPDATE SET
-        personalized_subject = EXCLUDED.personalized_subject,
-        personalized_body = EXCLUDED.personalized_body,
-        personalized_html = EXCLUDED.personalized_html,
-        personalized_text = EXCLUDED.personalized_text,
-        updated_at = now()
-      RETURNING id::text
+    return {
+      contact_id: contact.id,
+      personalized_subject: subject,
+      personalized_body: text || html,
+      personalized_html: html || null,
+      personalized_text: text || null,
+    };
+  });
+  for (let start = 0; start < recipients.length; start += RECIPIENT_BATCH_SIZE) {
+    const batch = recipients.slice(start, start + RECIPIENT_BATCH_SIZE);
+    await getPrisma().$executeRaw`
+      WITH input AS (
+        SELECT *
+        FROM jsonb_to_recordset(${JSON.stringify(batch)}::jsonb)
+          AS r(contact_id uuid, personalized_subject text, personalized_body text, personalized_html text, personalized_text text)
+      ), upserted AS (
+        INSERT INTO email_campaign_recipients (campaign_id, contact_id, status, personalized_subject, personalized_body, personalized_html, personalized_text)
+        SELECT ${campaignId}::uuid, contact_id, 'draft_ready', personalized_subject, personalized_body, personalized_html, personalized_text
+        FROM input
+        ON CONFLICT (campaign_id, contact_id) DO UPDATE SET
+          personalized_subject = EXCLUDED.personalized_subject,
+          personalized_body = EXCLUDED.personalized_body,
+          personalized_html = EXCLUDED.personalized_html,
+          personalized_text = EXCLUDED.personalized_text,
+          updated_at = now()
+        RETURNING id, contact_id
+      )
+      INSERT INTO email_events (campaign_id, recipient_id, contact_id, event_type)
+      SELECT ${campaignId}::uuid, id, contact_id, 'draft_generated'
+      FROM upserted
     `;
-    await logEvent({ campaignId, recipientId: recipient.id, contactId: contact.id, eventType: "draft_generated" });
   }
   await getPrisma().$executeRaw`UPDATE email_campaigns SET status = 'ready', updated_at = now() WHERE id = ${campaignId}::uuid`;
   await writeAuditEvent({ actor, entityType: "email_campaign", entityId: campaignId, action: "generate_recipients", metadata: { count: contacts.length } });
   refreshMail();
 }
 
-async function canSendTo(email: string, contactStatus?: string | null) {
-  if (contactStatus && UNSENDABLE_CONTACT_STATUSES.has(contactStatus)) return `Contact status is ${contactStatus}`;
-  const [suppressed] = await getPrisma().$queryRaw<Array<{ reason: string }>>`SELECT reason FROM email_suppressions WHERE email = ${email} LIMIT 1`;
-  return suppressed ? `Email suppressed: ${suppressed.reason}` : null;
-}
-
 export async function sendSingleEmail(_prev: ActionState, formData: FormData): Promise<ActionState> {
   const actor = await requireActiveUser(["OWNER", "ADMIN"]);
   const to = normalizeEmail(formData.get("to"));
@@ -361,11 +415,13 @@ export async function sendCampaignBatch(formData: FormData) {
   const actor = await requireActiveUser(["OWNER", "ADMIN"]);
   const campaignId = required(formData, "campaign_id");
   const recipients = await getPrisma().$queryRaw<
-    Array<{ id: string; contact_id: string; email: string; status: string; contact_status: string; personalized_subject: string | null; personalized_html: string | null; personalized_text: string | null }>
+    Array<{ id: string; contact_id: string; email: string; status: string; contact_status: string; suppression_reason: string | null; personalized_subject: string | null; personalized_html: string | null; personalized_text: string | null }>
   >`
-    SELECT r.id::text, r.contact_id::text, c.email, r.status, c.status AS contact_status, r.personalized_subject, r.personalized_html, r.personalized_text
+    SELECT r.id::text, r.contact_id::text, c.email, r.status, c.status AS contact_status, s.reason AS suppression_reason,
+      r.personalized_subject, r.personalized_html, r.personalized_text
     FROM email_campaign_recipients r
     JOIN email_contacts c ON c.id = r.contact_id
+    LEFT JOIN email_suppressions s ON s.email = c.email
     WHERE r.campaign_id = ${campaignId}::uuid
       AND r.status IN ('draft_ready', 'send_failed')
     ORDER BY r.created_at ASC
@@ -375,7 +431,7 @@ export async function sendCampaignBatch(formData: FormData) {
   let duplicate = 0;
   let suppressed = 0;
   for (const recipient of recipients) {
-    const blocked = await canSendTo(recipient.email, recipient.contact_status);
+    const blocked = sendBlockReason(recipient.suppression_reason, recipient.contact_status);
     if (blocked) {
       suppressed += 1;
       await getPrisma().$executeRaw`UPDATE email_campaign_recipients SET status = 'suppressed', last_error = ${blocked}, updated_at = now() WHERE id = ${recipient.id}::uuid`;
@@ -390,6 +446,7 @@ export async function sendCampaignBatch(formData: FormData) {
       campaignId,
       contactId: recipient.contact_id,
       recipientId: recipient.id,
+      sendChecked: true,
     });
     if (result.queued) {
       queued += 1;
@@ -446,15 +503,14 @@ export async function updateRecipientStatus(formData: FormData) {
   const actor = await requireActiveUser();
   const status = required(formData, "status");
   const id = required(formData, "id");
-  const updates =
-    status === "replied"
-      ? Prisma.sql`status = ${status}, replied_at = now(), updated_at = now()`
-      : status === "follow_up_needed"
-        ? Prisma.sql`status = ${status}, next_follow_up_at = ${value(formData, "next_follow_up_at")}::timestamptz, updated_at = now()`
-        : Prisma.sql`status = ${status}, updated_at = now()`;
-  await getPrisma().$executeRaw`UPDATE email_campaign_recipients SET ${updates} WHERE id = ${id}::uuid`;
   const [recipient] = await getPrisma().$queryRaw<Array<{ campaign_id: string; contact_id: string }>>`
-    SELECT campaign_id::text, contact_id::text FROM email_campaign_recipients WHERE id = ${id}::uuid
+    UPDATE email_campaign_recipients
+    SET status = ${status},
+      replied_at = CASE WHEN ${status} = 'replied' THEN now() ELSE replied_at END,
+      next_follow_up_at = CASE WHEN ${status} = 'follow_up_needed' THEN ${value(formData, "next_follow_up_at")}::timestamptz ELSE next_follow_up_at END,
+      updated_at = now()
+    WHERE id = ${id}::uuid
+    RETURNING campaign_id::text, contact_id::text
   `;
   await logEvent({ campaignId: recipient?.campaign_id, recipientId: id, contactId: recipient?.contact_id, eventType: status === "replied" ? "replied" : "status_changed", metadata: { status } });
   await writeAuditEvent({ actor, entityType: "email_recipient", entityId: id, action: "status_changed", metadata: { status } });
@@ -465,9 +521,9 @@ export async function addRecipientNote(formData: FormData) {
   const actor = await requireActiveUser();
   const id = required(formData, "id");
   const note = required(formData, "note");
-  await getPrisma().$executeRaw`UPDATE email_campaign_recipients SET notes = concat_ws(E'\n', notes, ${note}), updated_at = now() WHERE id = ${id}::uuid`;
   const [recipient] = await getPrisma().$queryRaw<Array<{ campaign_id: string; contact_id: string }>>`
-    SELECT campaign_id::text, contact_id::text FROM email_campaign_recipients WHERE id = ${id}::uuid
+    UPDATE email_campaign_recipients SET notes = concat_ws(E'\n', notes, ${note}), updated_at = now() WHERE id = ${id}::uuid
+    RETURNING campaign_id::text, contact_id::text
   `;
   await logEvent({ campaignId: recipient?.campaign_id, recipientId: id, contactId: recipient?.contact_id, eventType: "note_added", metadata: { note } });
   await writeAuditEvent({ actor, entityType: "email_recipient", entityId: id, action: "note_added" });
@@ -520,6 +576,7 @@ export async function updateSendSettings(formData: FormData) {
       updated_at = now()
     WHERE id = ${settings.id}::uuid
   `;
+  invalidateSendSettingsCache();
   await writeAuditEvent({ actor, entityType: "email_send_settings", entityId: settings.id, action: "update" });
   refreshMail();
 }
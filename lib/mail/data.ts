@@ -3,6 +3,14 @@ import { getPrisma } from "@/lib/prisma";
 
 export type SelectOption = { id: string; name: string };
 
+// Position in the event log: created_at is kept as Postgres text so no microseconds are lost.
+export type EventCursor = { createdAt: string; id: string };
+
+type SendSettings = { id: string; daily_limit: number; batch_size: number; min_seconds_between_sends: number; enabled: boolean; physical_address: string | null };
+
+const SEND_SETTINGS_CACHE_TTL_MS = 60_000;
+let sendSettingsCache: { settings: SendSettings; expiresAt: number } | null = null;
+
 export async function getMailDashboard() {
   const prisma = getPrisma();
   const [rows, events] = await Promise.all([
@@ -38,29 +46,40 @@ export async function getMailDashboard() {
   return { stats: rows[0], events };
 }
 
-export async function getRecentEvents(limit = 50) {
+export async function getRecentEvents(limit = 50, before?: EventCursor | null) {
+  const keyset = before
+    ? Prisma.sql`WHERE (e.created_at, e.id) < (${before.createdAt}::timestamptz, ${before.id}::uuid)`
+    : Prisma.empty;
   return getPrisma().$queryRaw<
-    Array<{ id: string; event_type: string; created_at: Date; metadata: Prisma.JsonValue; contact_email: string | null; campaign_name: string | null }>
+    Array<{ id: string; event_type: string; created_at: Date; cursor_created_at: string; metadata: Prisma.JsonValue; contact_email: string | null; campaign_name: string | null }>
   >`
-    SELECT e.id, e.event_type, e.created_at, e.metadata, c.email AS contact_email, ca.name AS campaign_name
+    SELECT e.id, e.event_type, e.created_at, e.created_at::text AS cursor_created_at, e.metadata, c.email AS contact_email, ca.name AS campaign_name
     FROM email_events e
     LEFT JOIN email_contacts c ON c.id = e.contact_id
     LEFT JOIN email_campaigns ca ON ca.id = e.campaign_id
-    ORDER BY e.created_at DESC
+    ${keyset}
+    ORDER BY e.created_at DESC, e.id DESC
     LIMIT ${limit}
   `;
 }
 
 export async function getOptions() {
-  const prisma = getPrisma();
-  const [contacts, companies, lists, templates, campaigns] = await Promise.all([
-    prisma.$queryRaw<SelectOption[]>`SELECT id::text AS id, coalesce(full_name, email) AS name FROM email_contacts ORDER BY created_at DESC LIMIT 500`,
-    prisma.$queryRaw<SelectOption[]>`SELECT id::text AS id, name FROM email_companies ORDER BY name LIMIT 500`,
-    prisma.$queryRaw<SelectOption[]>`SELECT id::text AS id, name FROM email_lists ORDER BY name LIMIT 500`,
-    prisma.$queryRaw<SelectOption[]>`SELECT id::text AS id, name FROM email_templates ORDER BY name LIMIT 500`,
-    prisma.$queryRaw<SelectOption[]>`SELECT id::text AS id, name FROM email_campaigns ORDER BY created_at DESC LIMIT 500`,
-  ]);
-  return { contacts, companies, lists, templates, campaigns };
+  const [options] = await getPrisma().$queryRaw<
+    Array<{ contacts: SelectOption[]; companies: SelectOption[]; lists: SelectOption[]; templates: SelectOption[]; campaigns: SelectOption[] }>
+  >`
+    SELECT
+      (SELECT coalesce(jsonb_agg(jsonb_build_object('id', id::text, 'name', coalesce(full_name, email)) ORDER BY created_at DESC), '[]'::jsonb)
+        FROM (SELECT id, full_name, email, created_at FROM email_contacts ORDER BY created_at DESC LIMIT 500) c) AS contacts,
+      (SELECT coalesce(jsonb_agg(jsonb_build_object('id', id::text, 'name', name) ORDER BY name), '[]'::jsonb)
+        FROM (SELECT id, name FROM email_companies ORDER BY name LIMIT 500) co) AS companies,
+      (SELECT coalesce(jsonb_agg(jsonb_build_object('id', id::text, 'name', name) ORDER BY name), '[]'::jsonb)
+        FROM (SELECT id, name FROM email_lists ORDER BY name LIMIT 500) l) AS lists,
+      (SELECT coalesce(jsonb_agg(jsonb_build_object('id', id::text, 'name', name) ORDER BY name), '[]'::jsonb)
+        FROM (SELECT id, name FROM email_templates ORDER BY name LIMIT 500) t) AS templates,
+      (SELECT coalesce(jsonb_agg(jsonb_build_object('id', id::text, 'name', name) ORDER BY created_at DESC), '[]'::jsonb)
+        FROM (SELECT id, name, created_at FROM email_campaigns ORDER BY created_at DESC LIMIT 500) ca) AS campaigns
+  `;
+  return options;
 }
 
 export async function ensureSendSettings() {
@@ -70,11 +89,23 @@ export async function ensureSendSettings() {
     SELECT 25, 5, 60, false
     WHERE NOT EXISTS (SELECT 1 FROM email_send_settings)
   `;
-  const [settings] = await prisma.$queryRaw<Array<{ id: string; daily_limit: number; batch_size: number; min_seconds_between_sends: number; enabled: boolean; physical_address: string | null }>>`
+  const [settings] = await prisma.$queryRaw<SendSettings[]>`
     SELECT id::text AS id, daily_limit, batch_size, min_seconds_between_sends, enabled, physical_address
     FROM email_send_settings
     ORDER BY created_at ASC
     LIMIT 1
   `;
+  sendSettingsCache = { settings, expiresAt: Date.now() + SEND_SETTINGS_CACHE_TTL_MS };
   return settings;
 }
+
+// Short-lived copy for per-email hot paths (footer rendering while queueing a campaign).
+// Send guards keep calling ensureSendSettings so the enabled flag and limits are always fresh.
+export async function getCachedSendSettings() {
+  if (sendSettingsCache && sendSettingsCache.expiresAt > Date.now()) return sendSettingsCache.settings;
+  return ensureSendSettings();
+}
+
+export function invalidateSendSettingsCache() {
+  sendSettingsCache = null;
+}
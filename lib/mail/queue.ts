@@ -2,8 +2,8 @@ import type { Prisma } from "@prisma/client";
 import type { AppUser } from "@/lib/auth/access";
 import { writeAuditEvent } from "@/lib/audit";
 import { getPrisma } from "@/lib/prisma";
-import { ensureSendSettings } from "@/lib/mail/data";
-import { normalizeEmail } from "@/lib/mail/render-template";
+import { ensureSendSettings, getCachedSendSettings } from "@/lib/mail/data";
+import { normalizeEmail, UUID_PATTERN } from "@/lib/mail/render-template";
 import { sendEmail } from "@/lib/mail/smtp";
 import { buildUnsubscribeUrl } from "@/lib/mail/unsubscribe";
 
@@ -65,23 +65,25 @@ function warmupCap(now = new Date()) {
 async function logQueueEvent(input: QueueEventInput) {
   await getPrisma().$executeRaw`
     INSERT INTO email_events (campaign_id, queue_id, recipient_id, contact_id, event_type, metadata)
-    VALUES (${input.campaignId ?? null}::uuid, ${input.queueId ?? null}::uuid, ${input.recipientId ?? null}::uuid, ${input.contactId ?? null}::uuid, ${input.eventType}, ${input.metadata ?? {}})
+    VALUES (${input.campaignId ?? null}::uuid, ${input.queueId ?? null}::uuid, ${input.recipientId ?? null}::uuid, ${input.contactId ?? null}::uuid, ${input.eventType}, coalesce(${input.metadata ?? null}::jsonb, '{}'::jsonb))
   `;
 }
 
 export async function getSendGuardStats() {
-  const settings = await ensureSendSettings();
-  const [stats] = await getPrisma().$queryRaw<
-    Array<{ sent_today: bigint; queued: bigint; sending: bigint; failed: bigint; suppressed: bigint; last_sent_at: Date | null }>
-  >`
-    SELECT
-      (SELECT count(*) FROM email_events WHERE event_type = 'sent' AND created_at >= current_date) AS sent_today,
-      (SELECT count(*) FROM email_queue WHERE status = 'queued') AS queued,
-      (SELECT count(*) FROM email_queue WHERE status = 'sending') AS sending,
-      (SELECT count(*) FROM email_queue WHERE status = 'failed') AS failed,
-      (SELECT count(*) FROM email_suppressions) AS suppressed,
-      (SELECT max(created_at) FROM email_events WHERE event_type = 'sent') AS last_sent_at
-  `;
+  const [settings, [stats]] = await Promise.all([
+    ensureSendSettings(),
+    getPrisma().$queryRaw<
+      Array<{ sent_today: bigint; queued: bigint; sending: bigint; failed: bigint; suppressed: bigint; last_sent_at: Date | null }>
+    >`
+      SELECT
+        (SELECT count(*) FROM email_events WHERE event_type = 'sent' AND created_at >= current_date) AS sent_today,
+        (SELECT count(*) FROM email_queue WHERE status = 'queued') AS queued,
+        (SELECT count(*) FROM email_queue WHERE status = 'sending') AS sending,
+        (SELECT count(*) FROM email_queue WHERE status = 'failed') AS failed,
+        (SELECT count(*) FROM email_suppressions) AS suppressed,
+        (SELECT max(created_at) FROM email_events WHERE event_type = 'sent') AS last_sent_at
+    `,
+  ]);
   const warmup = warmupCap();
   const effectiveDailyCap = Math.min(settings.daily_limit, warmup);
   return {
@@ -109,11 +111,41 @@ async function canSendTo(email: string, contactId?: string | null) {
     LIMIT 1
   `;
 
-  if (row?.suppression_reason) return `Email suppressed: ${row.suppression_reason}`;
-  if (row?.contact_status && UNSENDABLE_CONTACT_STATUSES.has(row.contact_status)) return `Contact status is ${row.contact_status}`;
+  return sendBlockReason(row?.suppression_reason ?? null, row?.contact_status ?? null);
+}
+
+export function sendBlockReason(suppressionReason: string | null, contactStatus: string | null) {
+  if (suppressionReason) return `Email suppressed: ${suppressionReason}`;
+  if (contactStatus && UNSENDABLE_CONTACT_STATUSES.has(contactStatus)) return `Contact status is ${contactStatus}`;
   return null;
 }
 
+async function findBlockedJobs(jobs: QueueJob[]) {
+  const blocked = new Map<string, string>();
+  if (jobs.length === 0) return blocked;
+
+  const rows = await getPrisma().$queryRaw<Array<{ id: string; suppression_reason: string | null; contact_status: string | null }>>`
+    SELECT q.id::text, s.reason AS suppression_reason, c.status AS contact_status
+    FROM email_queue q
+    LEFT JOIN email_suppressions s ON s.email = lower(btrim(q.recipient_email))
+    LEFT JOIN LATERAL (
+      SELECT status
+      FROM email_contacts
+      WHERE email = lower(btrim(q.recipient_email)) OR (q.contact_id IS NOT NULL AND id = q.contact_id)
+      LIMIT 1
+    ) c ON true
+    WHERE q.id = ANY(${jobs.map((job) => job.id)}::uuid[])
+  `;
+  for (const row of rows) {
+    const reason = sendBlockReason(row.suppression_reason, row.contact_status);
+    if (reason) blocked.set(row.id, reason);
+  }
+  for (const job of jobs) {
+    if (!normalizeEmail(job.recipient_email)) blocked.set(job.id, "recipient email is required");
+  }
+  return blocked;
+}
+
 async function claimDueJobs(limit: number) {
   return getPrisma().$transaction(async (tx) => {
     return tx.$queryRaw<QueueJob[]>`
@@ -138,80 +170,86 @@ async function claimDueJobs(limit: number) {
 }
 
 async function markSuppressed(job: QueueJob, reason: string) {
-  await getPrisma().$executeRaw`
-    UPDATE email_queue
-    SET status = 'suppressed', last_error = ${reason}, updated_at = now()
-    WHERE id = ${job.id}::uuid
-  `;
-  if (job.recipient_id) {
-    await getPrisma().$executeRaw`
-      UPDATE email_campaign_recipients
+  await Promise.all([
+    getPrisma().$executeRaw`
+      UPDATE email_queue
       SET status = 'suppressed', last_error = ${reason}, updated_at = now()
-      WHERE id = ${job.recipient_id}::uuid
-    `;
-  }
-  await logQueueEvent({
-    queueId: job.id,
-    campaignId: job.campaign_id,
-    recipientId: job.recipient_id,
-    contactId: job.contact_id,
-    eventType: "suppressed",
-    metadata: { reason },
-  });
+      WHERE id = ${job.id}::uuid
+    `,
+    job.recipient_id
+      ? getPrisma().$executeRaw`
+          UPDATE email_campaign_recipients
+          SET status = 'suppressed', last_error = ${reason}, updated_at = now()
+          WHERE id = ${job.recipient_id}::uuid
+        `
+      : null,
+    logQueueEvent({
+      queueId: job.id,
+      campaignId: job.campaign_id,
+      recipientId: job.recipient_id,
+      contactId: job.contact_id,
+      eventType: "suppressed",
+      metadata: { reason },
+    }),
+  ]);
 }
 
 async function markFailed(job: QueueJob, error: string) {
   const terminal = job.attempt_count >= job.max_attempts;
-  await getPrisma().$executeRaw`
-    UPDATE email_queue
-    SET status = 'failed',
-      last_error = ${error},
-      next_attempt_at = CASE WHEN ${terminal} THEN NULL ELSE now() + (${Math.min(job.attempt_count * 5, 30)} || ' minutes')::interval END,
-      updated_at = now()
-    WHERE id = ${job.id}::uuid
-  `;
-  if (job.recipient_id) {
-    await getPrisma().$executeRaw`
-      UPDATE email_campaign_recipients
-      SET status = 'send_failed', last_error = ${error}, updated_at = now()
-      WHERE id = ${job.recipient_id}::uuid
-    `;
-  }
-  await logQueueEvent({
-    queueId: job.id,
-    campaignId: job.campaign_id,
-    recipientId: job.recipient_id,
-    contactId: job.contact_id,
-    eventType: "failed",
-    metadata: { error, terminal },
-  });
+  await Promise.all([
+    getPrisma().$executeRaw`
+      UPDATE email_queue
+      SET status = 'failed',
+        last_error = ${error},
+        next_attempt_at = CASE WHEN ${terminal} THEN NULL ELSE now() + (${Math.min(job.attempt_count * 5, 30)} || ' minutes')::interval END,
+        updated_at = now()
+      WHERE id = ${job.id}::uuid
+    `,
+    job.recipient_id
+      ? getPrisma().$executeRaw`
+          UPDATE email_campaign_recipients
+          SET status = 'send_failed', last_error = ${error}, updated_at = now()
+          WHERE id = ${job.recipient_id}::uuid
+        `
+      : null,
+    logQueueEvent({
+      queueId: job.id,
+      campaignId: job.campaign_id,
+      recipientId: job.recipient_id,
+      contactId: job.contact_id,
+      eventType: "failed",
+      metadata: { error, terminal },
+    }),
+  ]);
 }
 
 async function markSent(job: QueueJob, messageId: string | null, response: string | null, dryRun: boolean) {
-  await getPrisma().$executeRaw`
-    UPDATE email_queue
-    SET status = 'sent',
-      provider_message_id = ${messageId},
-      sent_at = now(),
-      last_error = NULL,
-      updated_at = now()
-    WHERE id = ${job.id}::uuid
-  `;
-  if (job.recipient_id) {
-    await getPrisma().$executeRaw`
-      UPDATE email_campaign_recipients
-      SET status = 'sent', sent_at = now(), provider_message_id = ${messageId}, last_error = NULL, updated_at = now()
-      WHERE id = ${job.recipient_id}::uuid
-    `;
-  }
-  await logQueueEvent({
-    queueId: job.id,
-    campaignId: job.campaign_id,
-    recipientId: job.recipient_id,
-    contactId: job.contact_id,
-    eventType: "sent",
-    metadata: { messageId, response, dryRun },
-  });
+  await Promise.all([
+    getPrisma().$executeRaw`
+      UPDATE email_queue
+      SET status = 'sent',
+        provider_message_id = ${messageId},
+        sent_at = now(),
+        last_error = NULL,
+        updated_at = now()
+      WHERE id = ${job.id}::uuid
+    `,
+    job.recipient_id
+      ? getPrisma().$executeRaw`
+          UPDATE email_campaign_recipients
+          SET status = 'sent', sent_at = now(), provider_message_id = ${messageId}, last_error = NULL, updated_at = now()
+          WHERE id = ${job.recipient_id}::uuid
+        `
+      : null,
+    logQueueEvent({
+      queueId: job.id,
+      campaignId: job.campaign_id,
+      recipientId: job.recipient_id,
+      contactId: job.contact_id,
+      eventType: "sent",
+      metadata: { messageId, response, dryRun },
+    }),
+  ]);
 }
 
 export async function queueSingleEmail(input: {
@@ -224,10 +262,12 @@ export async function queueSingleEmail(input: {
   contactId?: string | null;
   recipientId?: string | null;
   scheduledAt?: Date | null;
+  // Set by callers that already ran sendBlockReason against the same suppression and contact rows.
+  sendChecked?: boolean;
 }) {
   const email = normalizeEmail(input.to);
   if (!email) throw new Error("to is required");
-  const blocked = await canSendTo(email, input.contactId);
+  const blocked = input.sendChecked ? null : await canSendTo(email, input.contactId);
   if (blocked) {
     await logQueueEvent({
       campaignId: input.campaignId,
@@ -243,7 +283,7 @@ export async function queueSingleEmail(input: {
   // Fetch physical_address for CAN-SPAM compliance footer (campaign sends only).
   let physicalAddress: string | null = null;
   if (input.campaignId) {
-    const settings = await ensureSendSettings();
+    const settings = await getCachedSendSettings();
     physicalAddress = settings.physical_address ?? null;
   }
 
@@ -323,7 +363,7 @@ export async function enqueueManualCampaign(input: {
     ? await getPrisma().$queryRaw<Array<{ contact_id: string | null; lead_id: string | null; email: string | null; status: string | null }>>`
         SELECT id::text AS contact_id, NULL::text AS lead_id, email, status
         FROM email_contacts
-        WHERE (${contactIds.length} = 0 OR id::text = ANY(${contactIds}))
+        WHERE (${contactIds.length} = 0 OR id = ANY(${contactIds.filter((id) => UUID_PATTERN.test(id))}::uuid[]))
         ORDER BY updated_at DESC
         LIMIT 1000
       `
@@ -333,7 +373,7 @@ export async function enqueueManualCampaign(input: {
         SELECT contact_id::text, id::text AS lead_id, email, NULL::text AS status
         FROM leads
         WHERE archived_at IS NULL
-          AND (${leadIds.length} = 0 OR id::text = ANY(${leadIds}))
+          AND (${leadIds.length} = 0 OR id = ANY(${leadIds.filter((id) => UUID_PATTERN.test(id))}::uuid[]))
         ORDER BY updated_at DESC
         LIMIT 1000
       `
@@ -395,12 +435,13 @@ export async function processEmailQueue(actor?: AppUser | null) {
 
   const batchLimit = Math.min(guards.settings.batch_size || 10, remainingDaily, MAX_PROCESS_BATCH);
   const jobs = await claimDueJobs(batchLimit);
+  const blockedJobs = await findBlockedJobs(jobs);
   let sent = 0;
   let failed = 0;
   let suppressed = 0;
 
   for (const job of jobs) {
-    const blocked = await canSendTo(job.recipient_email, job.contact_id);
+    const blocked = blockedJobs.get(job.id);
     if (blocked) {
       suppressed += 1;
       await markSuppressed(job, blocked);
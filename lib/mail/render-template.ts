@@ -25,3 +25,5 @@ export function renderTemplate(template: string | null | undefined, contact: Tem
 export function normalizeEmail(email: FormDataEntryValue | string | null | undefined) {
   return String(email ?? "").trim().toLowerCase();
 }
+
+export const UUID_PATTERN = /^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$/i;
@@ -33,35 +33,41 @@ export function buildUnsubscribeUrl(email: string) {
 export async function suppressByUnsubscribe(email: string) {
   const normalized = normalizeEmail(email);
   if (!normalized) throw new Error("email is required");
-  await getPrisma().$executeRaw`
-    INSERT INTO email_suppressions (email, reason, source)
-    VALUES (${normalized}, 'unsubscribed', 'unsubscribe_link')
-    ON CONFLICT (email) DO UPDATE SET reason = 'unsubscribed', source = 'unsubscribe_link'
-  `;
-  await getPrisma().$executeRaw`
-    UPDATE email_contacts SET status = 'unsubscribed', updated_at = now() WHERE email = ${normalized}
-  `;
-  await getPrisma().$executeRaw`
-    INSERT INTO email_events (event_type, metadata)
-    VALUES ('unsubscribed', ${JSON.stringify({ email: normalized, source: "unsubscribe_link" })}::jsonb)
-  `;
+  const prisma = getPrisma();
+  await prisma.$transaction([
+    prisma.$executeRaw`
+      INSERT INTO email_suppressions (email, reason, source)
+      VALUES (${normalized}, 'unsubscribed', 'unsubscribe_link')
+      ON CONFLICT (email) DO UPDATE SET reason = 'unsubscribed', source = 'unsubscribe_link'
+    `,
+    prisma.$executeRaw`
+      UPDATE email_contacts SET status = 'unsubscribed', updated_at = now() WHERE email = ${normalized}
+    `,
+    prisma.$executeRaw`
+      INSERT INTO email_events (event_type, metadata)
+      VALUES ('unsubscribed', jsonb_build_object('email', ${normalized}::text, 'source', 'unsubscribe_link'))
+    `,
+  ]);
   await writeAuditEvent({ actor: null, entityType: "email_suppression", action: "unsubscribe", metadata: { email: normalized } });
 }
 
 export async function suppressByBounce(email: string, reason: "bounce" | "complaint" = "bounce", source = "webhook") {
   const normalized = normalizeEmail(email);
   if (!normalized) throw new Error("email is required");
-  await getPrisma().$executeRaw`
-    INSERT INTO email_suppressions (email, reason, source)
-    VALUES (${normalized}, ${reason}, ${source})
-    ON CONFLICT (email) DO UPDATE SET reason = ${reason}, source = ${source}
-  `;
-  await getPrisma().$executeRaw`
-    UPDATE email_contacts SET status = 'bounced', updated_at = now() WHERE email = ${normalized}
-  `;
-  await getPrisma().$executeRaw`
-    INSERT INTO email_events (event_type, metadata)
-    VALUES (${reason}, ${JSON.stringify({ email: normalized, source })}::jsonb)
-  `;
+  const prisma = getPrisma();
+  await prisma.$transaction([
+    prisma.$executeRaw`
+      INSERT INTO email_suppressions (email, reason, source)
+      VALUES (${normalized}, ${reason}, ${source})
+      ON CONFLICT (email) DO UPDATE SET reason = ${reason}, source = ${source}
+    `,
+    prisma.$executeRaw`
+      UPDATE email_contacts SET status = 'bounced', updated_at = now() WHERE email = ${normalized}
+    `,
+    prisma.$executeRaw`
+      INSERT INTO email_events (event_type, metadata)
+      VALUES (${reason}, jsonb_build_object('email', ${normalized}::text, 'source', ${source}::text))
+    `,
+  ]);
   await writeAuditEvent({ actor: null, entityType: "email_suppression", action: reason, metadata: { email: normalized, source } });
 }
@@ -0,0 +1,3 @@
+-- Supports keyset pagination of the email event log on (created_at, id).
+CREATE INDEX IF NOT EXISTS email_events_created_at_id_idx
+  ON email_events(created_at DESC, id DESC);
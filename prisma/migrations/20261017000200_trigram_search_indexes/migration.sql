@@ -0,0 +1,13 @@
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Trigram indexes so the '%term%' ILIKE searches on the lead and company lists
+-- can use bitmap index scans instead of scanning the table. Contact search ORs its
+-- columns with the joined company name, which no per-table index can serve.
+CREATE INDEX IF NOT EXISTS leads_email_trgm_idx ON leads USING gin (email gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS leads_phone_trgm_idx ON leads USING gin (phone gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS leads_company_name_trgm_idx ON leads USING gin (company_name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS leads_notes_trgm_idx ON leads USING gin (notes gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS email_companies_name_trgm_idx ON email_companies USING gin (name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS email_companies_domain_trgm_idx ON email_companies USING gin (domain gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS email_companies_website_trgm_idx ON email_companies USING gin (website gin_trgm_ops);
@@ -0,0 +1,7 @@
+-- Stored display name so lead search and sort read a column instead of
+-- evaluating concat_ws per row, and so the name can carry a trigram index.
+ALTER TABLE IF EXISTS leads
+  ADD COLUMN IF NOT EXISTS full_name text
+  GENERATED ALWAYS AS (btrim(coalesce(first_name, '') || ' ' || coalesce(last_name, ''))) STORED;
+
+CREATE INDEX IF NOT EXISTS leads_full_name_trgm_idx ON leads USING gin (full_name gin_trgm_ops);
@@ -0,0 +1,17 @@
+-- Every lead read filters archived_at IS NULL; these partial indexes cover only
+-- live rows so list paging, status filters and the filter dropdowns skip archived leads.
+CREATE INDEX IF NOT EXISTS leads_live_created_at_id_idx
+  ON leads(created_at DESC, id DESC)
+  WHERE archived_at IS NULL;
+
+CREATE INDEX IF NOT EXISTS leads_live_status_idx
+  ON leads(status)
+  WHERE archived_at IS NULL;
+
+CREATE INDEX IF NOT EXISTS leads_live_source_idx
+  ON leads(source)
+  WHERE archived_at IS NULL AND source IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS leads_live_assigned_to_idx
+  ON leads(assigned_to)
+  WHERE archived_at IS NULL AND assigned_to IS NOT NULL;
@@ -0,0 +1,13 @@
+-- Support the keyset-paged CSV exports so each batch is an index range scan
+-- rather than a full scan and top-N sort.
+CREATE INDEX IF NOT EXISTS email_contacts_created_at_id_idx
+  ON email_contacts(created_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS email_suppressions_created_at_id_idx
+  ON email_suppressions(created_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS email_companies_name_id_idx
+  ON email_companies(name, id);
+
+CREATE INDEX IF NOT EXISTS lead_events_created_at_id_idx
+  ON lead_events(created_at DESC, id DESC);